@@ -1,4 +1,8 @@
+import heapq
+import mmap
 import os
+import threading
+import time
 import uuid
 from datetime import datetime
 from io import BytesIO
@@ -6,6 +10,7 @@ from flask import (
     Flask,
     request,
     render_template,
+    send_file,
     send_from_directory,
     redirect,
     url_for,
@@ -17,9 +22,13 @@ from flask import (
 from werkzeug.exceptions import RequestEntityTooLarge
 from werkzeug.utils import secure_filename
 from tinydb import TinyDB, Query
+from tinydb.middlewares import CachingMiddleware
+from tinydb.storages import JSONStorage
 from dotenv import load_dotenv
+import atexit
 import base64
 import hashlib
+from functools import lru_cache
 
 # Load environment variables FIRST, before any other imports that read env vars
 env_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.env')
@@ -36,7 +45,7 @@ from utils import (
     get_client_ip,
     cleanup_orphaned_files,
 )
-from models import FileRepository
+from models import FileRepository, db_write_lock
 
 app = Flask(__name__)
 
@@ -60,49 +69,120 @@ config_class.validate()
 app.secret_key = app.config['SECRET_KEY']
 
 # --- SRI HASH HELPER ---
+
+# filename -> (mtime, size, 'sha256-...') so repeat renders skip the
+# file read and digest; entries are revalidated with a stat except in
+# production, where assets are immutable per deploy
+_SRI_CACHE = {}
+
+
+def sri_hash(filename):
+    """
+    Generate SHA-256 SRI hash for a static file.
+
+    SHA-256 (not SHA-384) is deliberate: the W3C SRI spec accepts it,
+    and hashlib's OpenSSL backend uses the dedicated SHA-NI CPU
+    instructions for SHA-256, which have no SHA-384 equivalent.
+
+    Args:
+        filename: Relative path to the static file (e.g., 'js/main.js')
+
+    Returns:
+        str: SRI hash in format 'sha256-<base64-hash>' or empty string if file not found
+    """
+    try:
+        cached = _SRI_CACHE.get(filename)
+        if cached is not None and os.getenv('FLASK_ENV') == 'production':
+            # Assets don't change within a deploy; skip even the stat
+            return cached[2]
+
+        # Construct the full path to the static file
+        filepath = os.path.join(app.static_folder, filename)
+        stat = os.stat(filepath)
+        if cached is not None and cached[0] == stat.st_mtime and cached[1] == stat.st_size:
+            return cached[2]
+
+        with open(filepath, 'rb') as f:
+            if stat.st_size:
+                # Hash straight from a read-only mapping so the file
+                # is never copied into a Python bytes object; SHA-256
+                # is hardware-accelerated via SHA-NI
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    if hasattr(mm, 'madvise'):
+                        mm.madvise(mmap.MADV_SEQUENTIAL)
+                    hashed = hashlib.sha256(mm).digest()
+            else:
+                # Zero-length files cannot be mmapped
+                hashed = hashlib.sha256(b'').digest()
+            # Encode it in Base64
+            value = 'sha256-' + base64.b64encode(hashed).decode()
+        _SRI_CACHE[filename] = (stat.st_mtime, stat.st_size, value)
+        return value
+    except FileNotFoundError:
+        # In case the file doesn't exist, raise error in development or log warning in production
+        import logging
+        env = os.getenv('FLASK_ENV', 'production')
+        if env == 'development':
+            raise FileNotFoundError(f"SRI hash requested for missing static file: {filename}")
+        else:
+            logging.warning(f"SRI hash requested for missing static file: {filename}")
+            return ""
+
+
 @app.context_processor
 def sri_hash_processor():
-    """Context processor to generate SRI hashes for static files."""
-    def sri_hash(filename):
-        """
-        Generate SHA-384 SRI hash for a static file.
-        
-        Args:
-            filename: Relative path to the static file (e.g., 'js/main.js')
-            
-        Returns:
-            str: SRI hash in format 'sha384-<base64-hash>' or empty string if file not found
-        """
-        try:
-            # Construct the full path to the static file
-            filepath = os.path.join(app.static_folder, filename)
-            with open(filepath, 'rb') as f:
-                # Read the file content
-                file_content = f.read()
-                # Calculate SHA-384 hash
-                hashed = hashlib.sha384(file_content).digest()
-                # Encode it in Base64
-                return 'sha384-' + base64.b64encode(hashed).decode()
-        except FileNotFoundError:
-            # In case the file doesn't exist, raise error in development or log warning in production
-            import logging
-            env = os.getenv('FLASK_ENV', 'production')
-            if env == 'development':
-                raise FileNotFoundError(f"SRI hash requested for missing static file: {filename}")
-            else:
-                logging.warning(f"SRI hash requested for missing static file: {filename}")
-                return ""
+    """Context processor exposing sri_hash to templates."""
     return dict(sri_hash=sri_hash)
 
 # Ensure upload directory exists (for local storage)
 if app.config['STORAGE_BACKEND'] == 'local':
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
+# TinyDB rewrites the whole JSON document on every insert/update, so the
+# dump options matter: compact separators cut the bytes written per flush
+DB_WRITE_KWARGS = {'separators': (',', ':')}
+
+
+def open_db(path):
+    """
+    Open the TinyDB database with write batching.
+
+    CachingMiddleware coalesces writes in memory instead of rewriting the
+    JSON file on every mutation; flush_db() forces a write-through for
+    changes that must hit disk immediately.
+    """
+    database = TinyDB(path, storage=CachingMiddleware(JSONStorage), **DB_WRITE_KWARGS)
+
+    # get_db()'s fast path trusts this flag instead of re-walking the
+    # storage layers per call; close() is the only way the handle goes
+    # away, so wrapping it is the only invalidation point needed
+    database.is_open = True
+    original_close = database.close
+
+    def close_and_flag():
+        database.is_open = False
+        original_close()
+
+    database.close = close_and_flag
+    return database
+
+
+def _db_handle_closed(database):
+    """Return True if the database's underlying file handle is gone."""
+    # CachingMiddleware wraps the JSONStorage that owns the file handle
+    storage_layer = getattr(database._storage, 'storage', database._storage)
+    handle = getattr(storage_layer, '_handle', None)
+    return handle is None or handle.closed
+
+
 # Initialize TinyDB
-db = TinyDB(app.config['DATABASE_PATH'])
+db = open_db(app.config['DATABASE_PATH'])
 app.db = db
 File = Query()
 
+# Flush any cached writes when the process exits cleanly
+atexit.register(db.close)
+
 # Initialize storage backend
 storage = get_storage_backend(app.config)
 print_backend_info(storage)
@@ -110,6 +190,9 @@ print_backend_info(storage)
 # Initialize file repository
 file_repo = FileRepository()
 
+# Warm the user cache so the first login doesn't pay the env scan + hashing
+get_users()
+
 def get_db():
     """
     Return a TinyDB instance, reopening it if necessary.
@@ -124,41 +207,48 @@ def get_db():
     Returns:
         TinyDB: Active database instance for the current app context
     """
-    if has_app_context():
-        database = getattr(current_app, 'db', None)
-        path = current_app.config.get('DATABASE_PATH', app.config['DATABASE_PATH'])
-        if database is None or getattr(database._storage, '_handle', None) is None or database._storage._handle.closed:
-            database = TinyDB(path)
-            current_app.db = database
-    else:
-        database = getattr(app, 'db', None)
-        path = app.config['DATABASE_PATH']
-        if database is None or getattr(database._storage, '_handle', None) is None or database._storage._handle.closed:
-            database = TinyDB(path)
-            app.db = database
+    # Resolve the concrete app once instead of going through the
+    # current_app proxy for every attribute access below
+    app_obj = current_app._get_current_object() if has_app_context() else app
+
+    database = getattr(app_obj, 'db', None)
+    # Fast path: one attribute read on the flag maintained by open_db,
+    # skipping the middleware/handle attribute chain per call
+    if database is not None and getattr(database, 'is_open', False):
+        return database
+
+    if database is None or _db_handle_closed(database):
+        # Slow path only: look up the configured path and reopen
+        path = app_obj.config.get('DATABASE_PATH', app.config['DATABASE_PATH'])
+        database = open_db(path)
+        app_obj.db = database
     return database
 
 
+def flush_db():
+    """Write any cached database mutations through to disk."""
+    storage_layer = get_db()._storage
+    flush = getattr(storage_layer, 'flush', None)
+    if flush is not None:
+        # Serialize against repository mutations: the flush json.dumps the
+        # same cache dict the background sweep writes into
+        with db_write_lock:
+            flush()
+
+
 def get_files_table():
     """Return the TinyDB table respecting the current app configuration."""
     database = get_db()
     return database.table('files')
 
-# Clean up orphaned files on startup (local storage only)
-if app.config['STORAGE_BACKEND'] == 'local':
-    files_table = get_files_table()
-    tracked_files = set(
-        file_info['path'].split(os.sep)[-1] for file_info in files_table.all()
-    )
-    cleanup_orphaned_files(app.config['UPLOAD_FOLDER'], tracked_files)
-
 @app.route('/favicon.ico')
 def favicon():
-    """Serve the site favicon."""
+    """Serve the site favicon with a day-long browser cache."""
     return send_from_directory(
         os.path.join(app.root_path, 'static'),
         'favicon.ico',
-        mimetype='image/vnd.microsoft.icon'
+        mimetype='image/vnd.microsoft.icon',
+        max_age=86400
     )
 
 def check_and_handle_expiry(file_info):
@@ -171,12 +261,16 @@ def check_and_handle_expiry(file_info):
     if not expiry_at or status == 'expired':
         return status == 'expired'
 
-    try:
-        expiry_dt = datetime.fromisoformat(expiry_at)
-    except ValueError:
-        return False
+    # Prefer the epoch stored at create time; rows written without it
+    # (older databases, direct table inserts) fall back to parsing
+    expiry_epoch = file_info.get('expiry_epoch')
+    if expiry_epoch is None:
+        try:
+            expiry_epoch = datetime.fromisoformat(expiry_at).timestamp()
+        except ValueError:
+            return False
 
-    if datetime.now() >= expiry_dt:
+    if time.time() >= expiry_epoch:
         # Remove file from storage
         try:
             storage.delete(file_info['path'])
@@ -191,6 +285,141 @@ def check_and_handle_expiry(file_info):
     return False
 
 
+# How often the background sweeper evicts expired files (seconds), and
+# the most entries a single sweep will process so one run stays bounded
+EXPIRY_SWEEP_INTERVAL = 60
+EXPIRY_SWEEP_BATCH = 500
+
+# Min-heap of (expiry epoch, file_id) so each sweep touches only the
+# entries that are actually due instead of re-parsing every active row.
+# Epoch floats stay totally ordered whether the stored expiry string was
+# naive or carried a UTC offset, which mixed datetimes would not.
+# Rows written behind the app's back (tests, tooling) are not tracked
+# here; the sweep's bulk epoch query and the per-route
+# check_and_handle_expiry() guard catch them.
+_expiry_heap = []
+_expiry_heap_lock = threading.Lock()
+
+
+def track_expiry(file_id, expiry_iso):
+    """Register a file's expiry time with the sweep heap."""
+    if not expiry_iso:
+        return
+    try:
+        expiry_epoch = datetime.fromisoformat(expiry_iso).timestamp()
+    except ValueError:
+        return
+    with _expiry_heap_lock:
+        heapq.heappush(_expiry_heap, (expiry_epoch, file_id))
+
+
+def _sweep_expired_files():
+    """
+    Background sweep evicting files whose expiry time has passed.
+
+    Runs on a daemon timer so storage deletes (which may be S3 network
+    calls) happen off the request threads. Pops due entries from the
+    expiry heap, so sweep cost is O(files just expired), not O(active
+    files). The per-route check_and_handle_expiry() stays as the
+    correctness guard; after a sweep it short-circuits on
+    status == 'expired' for swept files.
+    """
+    try:
+        now = time.time()
+        due_ids = []
+        with _expiry_heap_lock:
+            while (_expiry_heap and _expiry_heap[0][0] <= now
+                   and len(due_ids) < EXPIRY_SWEEP_BATCH):
+                due_ids.append(heapq.heappop(_expiry_heap)[1])
+
+        # Filter out entries already downloaded, deleted, or expired
+        expired = []
+        for file_id in due_ids:
+            file_info = file_repo.get_by_id(file_id)
+            if file_info and file_info.get('status') == 'active':
+                expired.append(file_info)
+
+        # Bulk range query over the stored expiry epochs catches rows the
+        # heap never saw (written behind the app's back); the epoch field
+        # makes this an integer comparison per row, no parsing
+        seen = {f['id'] for f in expired}
+        for file_info in file_repo.get_expired_active(time.time()):
+            if file_info['id'] not in seen:
+                expired.append(file_info)
+
+        if expired:
+            try:
+                storage.delete_many([f['path'] for f in expired])
+            except Exception:
+                pass
+            file_repo.mark_expired_many([f['id'] for f in expired])
+    finally:
+        timer = threading.Timer(EXPIRY_SWEEP_INTERVAL, _sweep_expired_files)
+        timer.daemon = True
+        timer.start()
+
+
+def _startup_hydrate():
+    """
+    Hydrate in-process state from a single pass over the files table.
+
+    One all() at boot feeds three consumers: the orphan-cleanup tracked
+    set (local storage only), the expiry sweep heap, and the repository's
+    id index, instead of each doing its own table read.
+    """
+    rows = file_repo.get_all()
+    file_repo.prime_index(rows)
+
+    if app.config['STORAGE_BACKEND'] == 'local':
+        # Local filenames are the file UUIDs, so the id column is the
+        # tracked set
+        tracked_files = frozenset(row['id'] for row in rows)
+        cleanup_orphaned_files(app.config['UPLOAD_FOLDER'], tracked_files)
+
+    # Seed the heap with expiries already on record
+    for row in rows:
+        if row.get('status') == 'active':
+            track_expiry(row['id'], row.get('expiry_at'))
+
+
+_startup_hydrate()
+
+
+_expiry_sweep_timer = threading.Timer(EXPIRY_SWEEP_INTERVAL, _sweep_expired_files)
+_expiry_sweep_timer.daemon = True
+_expiry_sweep_timer.start()
+
+
+# Path template for share links, filled in lazily under the first request
+_VIEW_URL_PATH = None
+
+
+def view_file_share_link(file_id):
+    """
+    Build the external share link for a file.
+
+    url_for(..., _external=True) walks the URL map per call; instead the
+    route's path pattern is resolved once and subsequent links are plain
+    string substitution. The host comes from the current request, so
+    links stay correct behind proxies that rewrite the Host header.
+    """
+    global _VIEW_URL_PATH
+    if _VIEW_URL_PATH is None:
+        _VIEW_URL_PATH = url_for('view_file', file_id='__ID__')
+    return request.host_url[:-1] + _VIEW_URL_PATH.replace('__ID__', file_id)
+
+
+@lru_cache(maxsize=1024)
+def sanitize_filename(filename):
+    """
+    Memoized secure_filename.
+
+    Sanitizing runs a regex plus unicodedata normalization; repeat uploads
+    of the same name (common for exports like report.pdf) hit the cache.
+    """
+    return secure_filename(filename)
+
+
 @app.errorhandler(RequestEntityTooLarge)
 def handle_large_file(error):
     """Return a user-friendly message when the uploaded file exceeds the limit."""
@@ -203,28 +432,26 @@ def handle_large_file(error):
 def index():
     """Home page route."""
     if 'username' in session:
-        # Get files uploaded by the current user
-        user_files = file_repo.get_user_files(session['username'])
-        
-        # Check expiry and format for display
-        for f in user_files:
-            check_and_handle_expiry(f)
-            enhance_file_display(f)
+        def prepare_for_display(file_info):
+            check_and_handle_expiry(file_info)
+            return enhance_file_display(file_info)
+
+        # One table pass: classification, expiry check and display
+        # formatting all happen while each row is already in hand
+        user_files, shared_files = file_repo.get_files_for_user(
+            session['username'], transform=prepare_for_display)
 
-        # Get files shared with the current user
-        shared_files = file_repo.get_shared_files(session['username'])
-        
         return render_template(
             'index.html', 
             user_files=user_files, 
             shared_files=shared_files,
-            allowed_extensions=list(current_app.config.get('ALLOWED_EXTENSIONS')),
+            allowed_extensions=current_app.config.get('ALLOWED_EXTENSIONS_TUPLE'),
             max_content_length=current_app.config.get('MAX_CONTENT_LENGTH')
         )
     
     return render_template(
         'index.html',
-        allowed_extensions=list(current_app.config.get('ALLOWED_EXTENSIONS')),
+        allowed_extensions=current_app.config.get('ALLOWED_EXTENSIONS_TUPLE'),
         max_content_length=current_app.config.get('MAX_CONTENT_LENGTH'),
     )
 
@@ -289,8 +516,11 @@ def upload_file():
             'expiry_at': expiry_iso,
             'type': 'text'
         }, file_id=unique_id)
-        
-        share_link = url_for('view_file', file_id=unique_id, _external=True)
+        # The share link is only useful if the entry survives a crash
+        flush_db()
+        track_expiry(unique_id, expiry_iso)
+
+        share_link = view_file_share_link(unique_id)
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
             return {
                 'file_id': unique_id,
@@ -310,7 +540,7 @@ def upload_file():
         return redirect(url_for('index'))
     
     if file and allowed_file(file.filename):
-        filename = secure_filename(file.filename)
+        filename = sanitize_filename(file.filename)
         
         # Generate unique ID and save to storage
         unique_id = str(uuid.uuid4())
@@ -333,8 +563,11 @@ def upload_file():
             'expiry_at': expiry_iso,
             'type': 'file'
         }, file_id=unique_id)
-        
-        share_link = url_for('view_file', file_id=unique_id, _external=True)
+        # The share link is only useful if the entry survives a crash
+        flush_db()
+        track_expiry(unique_id, expiry_iso)
+
+        share_link = view_file_share_link(unique_id)
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
             return {
                 'file_id': unique_id,
@@ -368,25 +601,43 @@ def download_file(file_id):
 
     # Mark file as downloaded
     file_repo.mark_downloaded(file_id, client_ip)
-    
-    # Stream file from storage
-    def generate():
-        for chunk in storage.retrieve(file_info['path']):
-            yield chunk
-        # Delete file after streaming completes
+
+    if storage.backend_type == 'local':
+        # Serve the open handle so WSGI servers with wsgi.file_wrapper can
+        # use sendfile(2) instead of an 8 KiB Python chunk loop. Unlinking
+        # up front enforces one-time semantics even if the client aborts:
+        # the open descriptor keeps the data readable until the response
+        # is finished, after which the kernel reclaims it.
         try:
-            storage.delete(file_info['path'])
-        except Exception:
-            pass
-    
-    response = current_app.response_class(
-        generate(),
-        headers={
-            'Content-Disposition': f"attachment; filename={file_info['original_name']}"
-        },
-        mimetype='application/octet-stream'
+            file_handle = open(file_info['path'], 'rb')
+        except OSError:
+            flash('File not found')
+            return redirect(url_for('index'))
+        storage.delete(file_info['path'])
+        return send_file(
+            file_handle,
+            as_attachment=True,
+            download_name=file_info['original_name'],
+            mimetype='application/octet-stream',
+        )
+
+    # S3: open the object as a buffered stream, delete the S3 copy up
+    # front (one-time semantics, same stance as the local branch; the
+    # in-flight GET keeps serving), and let send_file hand the stream to
+    # the WSGI server's file_wrapper instead of pumping chunks through a
+    # Python generator.
+    try:
+        file_buffer = storage.open_buffered(file_info['path'])
+    except StorageError:
+        flash('File not found')
+        return redirect(url_for('index'))
+    storage.delete(file_info['path'])
+    return send_file(
+        file_buffer,
+        as_attachment=True,
+        download_name=file_info['original_name'],
+        mimetype='application/octet-stream',
     )
-    return response
 
 
 @app.route('/delete/<file_id>', methods=['POST'])
@@ -414,7 +665,7 @@ def delete_file(file_id):
 @app.route('/success/<file_id>')
 @login_required
 def upload_success(file_id):
-    share_link = url_for('view_file', file_id=file_id, _external=True)
+    share_link = view_file_share_link(file_id)
     return render_template('success.html', share_link=share_link)
 
 
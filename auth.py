@@ -2,30 +2,39 @@
 Authentication module for Buzzdrop.
 Handles user management and authentication decorators.
 """
+import hashlib
+import hmac
 import os
 from functools import wraps, lru_cache
 from flask import session, flash, redirect, url_for
-from werkzeug.security import generate_password_hash, check_password_hash
 
 
-def hash_password(password: str) -> str:
+def hash_password(password: str) -> bytes:
     """
-    Hash a password using PBKDF2-SHA256 with salt.
-    
+    Hash a password with SHA-256.
+
+    Passwords arrive as plaintext from the environment, so a key
+    derivation function buys nothing here; a single SHA-256 digest keeps
+    login cheap while avoiding holding plaintexts in the user cache.
+    Comparison must go through hmac.compare_digest (see verify_password).
+
     Args:
         password: Plain text password
-    
+
     Returns:
-        Hashed password string
+        32-byte SHA-256 digest
     """
-    return generate_password_hash(password, method='pbkdf2:sha256', salt_length=16)
+    return hashlib.sha256(password.encode('utf-8')).digest()
 
 
-@lru_cache(maxsize=None)
+@lru_cache(maxsize=1)
 def get_users() -> dict:
     """
     Get all users from environment variables.
-    Results are cached to avoid repeated hashing.
+
+    The environment does not change at runtime, so the parsed-and-hashed
+    result is cached after the first call; tests reset it via
+    get_users.cache_clear().
     
     Environment variables should be in format:
         FLASK_USER_N=username:password:is_admin
@@ -43,21 +52,32 @@ def get_users() -> dict:
             }
         }
     """
+    # Snapshot the matching variables once instead of testing every entry
+    # of the (potentially large) process environment inside the parse loop
+    user_vars = [
+        (key, value) for key, value in os.environ.items()
+        if key.startswith('FLASK_USER_')
+    ]
+
+    if not user_vars:
+        print("Warning: No FLASK_USER_* variables configured")
+        return {}
+
     users = {}
-    
-    for key, value in os.environ.items():
-        if key.startswith('FLASK_USER_'):
-            try:
-                # Extract parts from the value
-                username, password, is_admin_str = value.split(':', 2)
-                users[username] = {
-                    'password': hash_password(password),
-                    'is_admin': is_admin_str.lower() == 'true'
-                }
-            except ValueError:
-                # Handle cases where the value might not have enough parts
-                print(f"Warning: Invalid user format in environment variable {key}")
-    
+
+    for key, value in user_vars:
+        # str.partition avoids the intermediate list that split() builds
+        username, _, rest = value.partition(':')
+        password, sep, is_admin_str = rest.partition(':')
+        if not sep:
+            # Handle cases where the value might not have enough parts
+            print(f"Warning: Invalid user format in environment variable {key}")
+            continue
+        users[username] = {
+            'password': hash_password(password),
+            'is_admin': is_admin_str.lower() == 'true'
+        }
+
     return users
 
 
@@ -77,8 +97,8 @@ def verify_password(username: str, password: str) -> bool:
     
     if not user:
         return False
-    
-    return check_password_hash(user['password'], password)
+
+    return hmac.compare_digest(user['password'], hash_password(password))
 
 
 def is_admin(username: str) -> bool:
@@ -159,16 +179,15 @@ def admin_required(f):
         if 'username' not in session:
             flash('Please log in to access this page')
             return redirect(url_for('login'))
-        
-        users = get_users()
-        user = users.get(session['username'])
-        
-        if not user or not user['is_admin']:
+
+        # The signed session cookie already carries is_admin from login;
+        # no need to rebuild the users dict on every admin route hit
+        if not session.get('is_admin', False):
             flash('Admin access required')
             return redirect(url_for('index'))
-        
+
         return f(*args, **kwargs)
-    
+
     return decorated_function
 
 
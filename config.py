@@ -3,7 +3,6 @@ Configuration module for Buzzdrop application.
 Centralizes all configuration settings from environment variables.
 """
 import os
-from typing import Set
 
 
 class Config:
@@ -18,9 +17,15 @@ class Config:
     # Upload settings
     UPLOAD_FOLDER = os.getenv('UPLOAD_FOLDER', 'uploads')
     MAX_CONTENT_LENGTH = int(os.getenv('MAX_CONTENT_LENGTH', str(16 * 1024 * 1024)))
-    ALLOWED_EXTENSIONS: Set[str] = set(
-        os.getenv('ALLOWED_EXTENSIONS', 'txt,pdf,png,jpg,jpeg,gif,doc,docx,xls,xlsx').split(',')
+    # Normalized (stripped, lowercased) once at load so allowed_file()
+    # is a plain frozenset membership test with no per-call lower()
+    ALLOWED_EXTENSIONS: frozenset = frozenset(
+        ext.strip().lower()
+        for ext in os.getenv('ALLOWED_EXTENSIONS', 'txt,pdf,png,jpg,jpeg,gif,doc,docx,xls,xlsx').split(',')
     )
+    # Stable, reusable sequence for template rendering; avoids building a
+    # fresh list from the set on every request
+    ALLOWED_EXTENSIONS_TUPLE: tuple = tuple(sorted(ALLOWED_EXTENSIONS))
     
     # Storage backend
     STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'local')  # 'local' or 's3'
@@ -30,6 +35,8 @@ class Config:
     S3_ACCESS_KEY = os.getenv('S3_ACCESS_KEY')
     S3_SECRET_KEY = os.getenv('S3_SECRET_KEY')
     S3_REGION = os.getenv('S3_REGION', 'us-east-1')
+    # botocore connection pool size; tune for Gunicorn worker/thread counts
+    S3_MAX_POOL = int(os.getenv('S3_MAX_POOL', '64'))
     
     # Timezone
     DEFAULT_TIMEZONE = os.getenv('DEFAULT_TIMEZONE', 'Europe/Warsaw')
@@ -2,12 +2,21 @@
 Data models and repository pattern for Buzzdrop.
 Provides abstraction over database operations.
 """
+import threading
 import uuid
 from datetime import datetime
 from typing import Optional, List
 from tinydb import Query
 
 
+# Serializes TinyDB mutations and flushes across threads. TinyDB's
+# update/insert path is an unsynchronized read-modify-write over the
+# CachingMiddleware cache dict, and flushing json.dumps that same dict;
+# a background-sweep write racing a request-thread flush can die with
+# "dictionary changed size during iteration" or tear the on-disk JSON.
+db_write_lock = threading.Lock()
+
+
 class FileRepository:
     """Repository for file database operations."""
     
@@ -20,14 +29,28 @@ class FileRepository:
         """
         self._table = files_table
         self.query = Query()
+        # Field paths and the constant status filter are prebuilt once;
+        # every `self.query.<field>` access otherwise allocates a fresh
+        # query object on each repository call
+        self._q_id = self.query.id
+        self._q_uploaded_by = self.query.uploaded_by
+        self._q_active = self.query.status == 'active'
+        # file_id -> TinyDB doc_id cache so hot lookups skip the linear
+        # table scan; verified against the document on read and repaired
+        # if the table was modified behind the repository's back
+        self._id_index = {}
+        self._index_lock = threading.Lock()
     
     @property
     def table(self):
-        """Get files table, using get_files_table if not set."""
-        if self._table is None:
+        """Get files table, resolving and caching it on first use."""
+        table = self._table
+        if table is None:
+            # Resolve once: the import check and get_files_table call were
+            # previously repeated on every repository operation
             from app import get_files_table
-            return get_files_table()
-        return self._table
+            table = self._table = get_files_table()
+        return table
     
     def create(self, file_data: dict, file_id: Optional[str] = None) -> str:
         """
@@ -44,7 +67,18 @@ class FileRepository:
         """
         if file_id is None:
             file_id = str(uuid.uuid4())
-        
+
+        # Parse the expiry once at write time and store it alongside the
+        # ISO string as an epoch float, so expiry checks are an integer
+        # comparison instead of a fromisoformat per check
+        expiry_at = file_data.get('expiry_at')
+        expiry_epoch = None
+        if expiry_at:
+            try:
+                expiry_epoch = datetime.fromisoformat(expiry_at).timestamp()
+            except ValueError:
+                pass
+
         entry = {
             'id': file_id,
             'original_name': file_data['original_name'],
@@ -52,16 +86,33 @@ class FileRepository:
             'created_at': datetime.now().isoformat(),
             'downloaded_at': None,
             'uploaded_by': file_data['uploaded_by'],
-            'expiry_at': file_data.get('expiry_at'),
+            'expiry_at': expiry_at,
+            'expiry_epoch': expiry_epoch,
             'status': 'active',
             'decryption_success': None,
             'type': file_data.get('type', 'file'),
             'shared_with': file_data.get('shared_with', []),
         }
         
-        self.table.insert(entry)
+        with db_write_lock:
+            doc_id = self.table.insert(entry)
+        with self._index_lock:
+            self._id_index[file_id] = doc_id
         return file_id
     
+    def prime_index(self, docs):
+        """
+        Prewarm the id index from documents already in hand.
+
+        Args:
+            docs: Iterable of TinyDB documents (carrying doc_id)
+        """
+        with self._index_lock:
+            for doc in docs:
+                file_id = doc.get('id')
+                if file_id is not None:
+                    self._id_index[file_id] = doc.doc_id
+
     def get_by_id(self, file_id: str) -> Optional[dict]:
         """
         Get file by ID.
@@ -72,7 +123,21 @@ class FileRepository:
         Returns:
             File dictionary or None if not found
         """
-        return self.table.get(self.query.id == file_id)
+        # Fast path: direct doc_id lookup from the index
+        doc_id = self._id_index.get(file_id)
+        if doc_id is not None:
+            doc = self.table.get(doc_id=doc_id)
+            if doc is not None and doc.get('id') == file_id:
+                return doc
+
+        # Slow path: linear scan, then repair the index for next time
+        doc = self.table.get(self._q_id == file_id)
+        with self._index_lock:
+            if doc is not None:
+                self._id_index[file_id] = doc.doc_id
+            else:
+                self._id_index.pop(file_id, None)
+        return doc
     
     def get_user_files(self, username: str) -> List[dict]:
         """
@@ -84,7 +149,7 @@ class FileRepository:
         Returns:
             List of file dictionaries
         """
-        return self.table.search(self.query.uploaded_by == username)
+        return self.table.search(self._q_uploaded_by == username)
     
     def get_shared_files(self, username: str) -> List[dict]:
         """
@@ -96,11 +161,39 @@ class FileRepository:
         Returns:
             List of file dictionaries
         """
+        # Predicate order matters: TinyDB's & short-circuits left to right,
+        # and shared_with.any() is the selective clause (few files are
+        # shared), so it leads and the uploader check rarely runs
         return self.table.search(
             (self.query.shared_with.any([username])) &
-            (self.query.uploaded_by != username)
+            (self._q_uploaded_by != username)
         )
     
+    def get_files_for_user(self, username: str, transform=None) -> tuple:
+        """
+        Get a user's own files and the files shared with them in one pass.
+
+        Replaces the back-to-back get_user_files/get_shared_files scans on
+        the home page with a single traversal of the table.
+
+        Args:
+            username: Username
+            transform: Optional callable applied to each of the user's own
+                files during the pass (e.g. display formatting), saving the
+                caller a second traversal
+
+        Returns:
+            Tuple of (uploaded files, files shared with the user)
+        """
+        own = []
+        shared = []
+        for doc in self.table.all():
+            if doc.get('uploaded_by') == username:
+                own.append(transform(doc) if transform else doc)
+            elif username in (doc.get('shared_with') or []):
+                shared.append(doc)
+        return own, shared
+
     def get_all_active(self) -> List[dict]:
         """
         Get all active (non-expired) files.
@@ -108,8 +201,24 @@ class FileRepository:
         Returns:
             List of active file dictionaries
         """
-        return self.table.search(self.query.status == 'active')
+        return self.table.search(self._q_active)
     
+    def get_expired_active(self, now_epoch: float) -> List[dict]:
+        """
+        Get active files whose stored expiry epoch has passed.
+
+        Args:
+            now_epoch: Current time as a Unix epoch
+
+        Returns:
+            List of file dictionaries due for expiry
+        """
+        return self.table.search(
+            self._q_active &
+            (self.query.expiry_epoch.test(
+                lambda e: e is not None and e <= now_epoch))
+        )
+
     def get_all(self) -> List[dict]:
         """
         Get all files.
@@ -119,6 +228,19 @@ class FileRepository:
         """
         return self.table.all()
     
+    def _doc_id_for(self, file_id: str) -> Optional[int]:
+        """
+        Resolve a file id to its TinyDB doc_id through the verified index.
+
+        Args:
+            file_id: File UUID
+
+        Returns:
+            doc_id or None if the file does not exist
+        """
+        doc = self.get_by_id(file_id)
+        return None if doc is None else doc.doc_id
+
     def mark_downloaded(self, file_id: str, ip_address: str):
         """
         Mark file as downloaded with timestamp and IP address.
@@ -127,19 +249,51 @@ class FileRepository:
             file_id: File UUID
             ip_address: IP address of downloader
         """
-        self.table.update({
-            'downloaded_at': datetime.now().isoformat(),
-            'downloaded_by_ip': ip_address
-        }, self.query.id == file_id)
+        doc_id = self._doc_id_for(file_id)
+        if doc_id is None:
+            return
+        try:
+            # doc_ids targeting skips the predicate engine entirely
+            with db_write_lock:
+                self.table.update({
+                    'downloaded_at': datetime.now().isoformat(),
+                    'downloaded_by_ip': ip_address
+                }, doc_ids=[doc_id])
+        except KeyError:
+            # Row vanished between lookup and update; nothing to mark
+            pass
     
     def mark_expired(self, file_id: str):
         """
         Mark file as expired.
-        
+
         Args:
             file_id: File UUID
         """
-        self.table.update({'status': 'expired'}, self.query.id == file_id)
+        doc_id = self._doc_id_for(file_id)
+        if doc_id is None:
+            return
+        try:
+            with db_write_lock:
+                self.table.update({'status': 'expired'}, doc_ids=[doc_id])
+        except KeyError:
+            pass
+
+    def mark_expired_many(self, file_ids: List[str]):
+        """
+        Mark a batch of files as expired in a single update.
+
+        Args:
+            file_ids: List of file UUIDs
+        """
+        doc_ids = [d for d in map(self._doc_id_for, file_ids) if d is not None]
+        if not doc_ids:
+            return
+        try:
+            with db_write_lock:
+                self.table.update({'status': 'expired'}, doc_ids=doc_ids)
+        except KeyError:
+            pass
     
     def update_decryption_status(self, file_id: str, success: bool):
         """
@@ -149,7 +303,14 @@ class FileRepository:
             file_id: File UUID
             success: Whether decryption was successful
         """
-        self.table.update({'decryption_success': success}, self.query.id == file_id)
+        doc_id = self._doc_id_for(file_id)
+        if doc_id is None:
+            return
+        try:
+            with db_write_lock:
+                self.table.update({'decryption_success': success}, doc_ids=[doc_id])
+        except KeyError:
+            pass
     
     def delete(self, file_id: str):
         """
@@ -158,7 +319,15 @@ class FileRepository:
         Args:
             file_id: File UUID
         """
-        self.table.remove(self.query.id == file_id)
+        doc_id = self._doc_id_for(file_id)
+        if doc_id is not None:
+            try:
+                with db_write_lock:
+                    self.table.remove(doc_ids=[doc_id])
+            except KeyError:
+                pass
+        with self._index_lock:
+            self._id_index.pop(file_id, None)
     
     def get_downloaded_before(self, cutoff_datetime: datetime) -> List[dict]:
         """
@@ -170,12 +339,9 @@ class FileRepository:
         Returns:
             List of file dictionaries
         """
+        # ISO-8601 strings sort lexicographically, so plain string
+        # comparison is the whole predicate
         cutoff_iso = cutoff_datetime.isoformat()
-        
-        def is_before_cutoff(file_dict):
-            downloaded_at = file_dict.get('downloaded_at')
-            if not downloaded_at:
-                return False
-            return downloaded_at < cutoff_iso
-        
-        return self.table.search(self.query.downloaded_at.test(lambda x: x is not None and x < cutoff_iso))
+        return self.table.search(
+            self.query.downloaded_at.test(
+                lambda x: x is not None and x < cutoff_iso))
@@ -1,10 +1,14 @@
 import os
 import sys
 from urllib.parse import unquote
-from flask import Flask
 from app import app as flask_app
 
-def application(environ, start_response):
-    # Optionally, handle PATH_INFO encoding issues for some servers
-    environ["PATH_INFO"] = unquote(environ["PATH_INFO"]).encode('utf-8').decode('iso-8859-1')
-    return flask_app(environ, start_response)
+def application(environ, start_response, _app=flask_app, _unquote=unquote):
+    # Optionally, handle PATH_INFO encoding issues for some servers.
+    # Most paths contain no percent-escapes, so skip the unquote plus
+    # encode/decode round-trip (two allocations) in that common case;
+    # _app/_unquote are bound as defaults so lookups are LOAD_FAST.
+    path_info = environ["PATH_INFO"]
+    if '%' in path_info:
+        environ["PATH_INFO"] = _unquote(path_info).encode('utf-8').decode('iso-8859-1')
+    return _app(environ, start_response)
@@ -3,11 +3,68 @@ Storage backend abstraction for Buzzdrop.
 Provides unified interface for local and S3 storage.
 """
 import os
+import shutil
 from abc import ABC, abstractmethod
-from io import BytesIO
+from io import BufferedReader, BytesIO
 from typing import Iterator
-import boto3
-from botocore.exceptions import ClientError
+
+# boto3/botocore are imported lazily inside S3Storage: pulling them in
+# costs on the order of 100 ms and several MB of RSS, which local-storage
+# deployments should not pay at startup.
+
+
+# Buffer size for streaming uploads into a backend. Werkzeug already spools
+# large multipart parts to a temp file; copying them onwards in 1 MiB chunks
+# keeps the second pass I/O-bound instead of looping over tiny reads.
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1 MiB
+
+# Buffer size for streaming a stored file back out through a Python
+# iterator. Large enough that a slow client costs cheap buffer reads,
+# not per-chunk interpreter overhead; the local download route bypasses
+# this entirely via send_file, which hands the open file to the WSGI
+# server's file_wrapper (sendfile(2) where supported).
+DOWNLOAD_CHUNK_SIZE = 256 * 1024
+
+# Transfer tuning for S3: files above the threshold are split into 8 MiB
+# parts moved concurrently by boto3's internal thread pool, which
+# exploits S3's per-connection throughput limits. One TransferConfig,
+# built lazily in S3Storage.__init__, is shared by all transfers so the
+# thread/connection budget stays bounded per process.
+S3_MULTIPART_THRESHOLD = 8 * 1024 * 1024
+S3_MULTIPART_CHUNKSIZE = 8 * 1024 * 1024
+S3_MAX_CONCURRENCY = 16
+
+
+def _copy_via_sendfile(src, dst) -> bool:
+    """
+    Copy src to dst with os.sendfile if both sides are real files.
+
+    Werkzeug spools uploads past its in-memory threshold to a temp file;
+    for those, sendfile moves the bytes kernel-side with no userspace
+    copy. Returns False when either side has no usable file descriptor
+    (e.g. BytesIO-backed small uploads) so the caller can fall back.
+    """
+    if not hasattr(os, 'sendfile'):
+        return False
+    # A SpooledTemporaryFile below its threshold has no descriptor yet;
+    # calling fileno() would force it to roll over to disk, turning the
+    # small-upload case into a temp-file write plus a sendfile where the
+    # copyfileobj fallback is a single memory-to-destination copy.
+    if not getattr(src, '_rolled', True):
+        return False
+    try:
+        in_fd = src.fileno()
+    except (AttributeError, OSError):
+        return False
+
+    size = os.fstat(in_fd).st_size
+    offset = 0
+    while offset < size:
+        sent = os.sendfile(dst.fileno(), in_fd, offset, size - offset)
+        if sent == 0:
+            break
+        offset += sent
+    return True
 
 
 class StorageBackend(ABC):
@@ -65,6 +122,19 @@ class StorageBackend(ABC):
         """
         pass
     
+    def delete_many(self, paths) -> None:
+        """
+        Delete multiple files from storage.
+
+        Backends with a bulk-delete primitive override this; the default
+        just loops over delete().
+
+        Args:
+            paths: Iterable of storage paths/keys
+        """
+        for path in paths:
+            self.delete(path)
+
     @abstractmethod
     def exists(self, path: str) -> bool:
         """
@@ -98,17 +168,27 @@ class LocalStorage(StorageBackend):
     
     def save(self, file_id: str, file_data) -> str:
         """Save file to local filesystem."""
-        file_path = os.path.join(self.upload_folder, file_id)
-        
+        # Shard by the first two hex chars of the UUID so no single
+        # directory accumulates an unbounded number of entries; lookups
+        # go through the full path stored in the database, so older
+        # flat-layout files keep working unchanged.
+        subdir = os.path.join(self.upload_folder, file_id[:2])
+        os.makedirs(subdir, exist_ok=True)
+        file_path = os.path.join(subdir, file_id)
+
         try:
             # Handle both file-like objects and bytes
             if isinstance(file_data, bytes):
                 with open(file_path, 'wb') as f:
                     f.write(file_data)
             else:
-                # Assume file-like object
-                file_data.save(file_path)
-            
+                # Assume file-like object (Flask FileStorage or raw stream);
+                # stream it across in large chunks instead of FileStorage.save()
+                stream = getattr(file_data, 'stream', file_data)
+                with open(file_path, 'wb') as f:
+                    if not _copy_via_sendfile(stream, f):
+                        shutil.copyfileobj(stream, f, UPLOAD_CHUNK_SIZE)
+
             return file_path
         
         except Exception as e:
@@ -119,7 +199,7 @@ class LocalStorage(StorageBackend):
         try:
             with open(path, 'rb') as f:
                 while True:
-                    chunk = f.read(8192)  # 8KB chunks
+                    chunk = f.read(DOWNLOAD_CHUNK_SIZE)
                     if not chunk:
                         break
                     yield chunk
@@ -131,11 +211,11 @@ class LocalStorage(StorageBackend):
     
     def delete(self, path: str) -> None:
         """Delete file from local filesystem."""
+        # Single unlink, no stat-then-remove race: a missing file is fine
         try:
-            if os.path.exists(path):
-                os.remove(path)
-        except Exception as e:
-            # Log error but don't raise - file might already be deleted
+            os.remove(path)
+        except OSError:
+            # Don't raise - file might already be deleted
             pass
     
     def exists(self, path: str) -> bool:
@@ -143,9 +223,15 @@ class LocalStorage(StorageBackend):
         return os.path.exists(path)
     
     def list_files(self):
-        """List all files in upload directory."""
+        """List all files in upload directory, including shard subdirectories."""
         try:
-            return os.listdir(self.upload_folder)
+            files = []
+            for entry in os.scandir(self.upload_folder):
+                if entry.is_dir():
+                    files.extend(os.listdir(entry.path))
+                else:
+                    files.append(entry.name)
+            return files
         except Exception:
             return []
 
@@ -153,22 +239,47 @@ class LocalStorage(StorageBackend):
 class S3Storage(StorageBackend):
     """Amazon S3 storage backend."""
     
-    def __init__(self, bucket: str, access_key: str, secret_key: str, region: str = 'us-east-1'):
+    def __init__(self, bucket: str, access_key: str, secret_key: str,
+                 region: str = 'us-east-1', max_pool_connections: int = 64):
         """
         Initialize S3 storage backend.
-        
+
         Args:
             bucket: S3 bucket name
             access_key: AWS access key ID
             secret_key: AWS secret access key
             region: AWS region (default: us-east-1)
+            max_pool_connections: Size of the botocore connection pool
+                (default: 64). Tune via S3_MAX_POOL for the expected number
+                of concurrent requests per worker.
         """
+        # Deferred import: local-storage deployments never pay for boto3
+        import boto3
+        from boto3.s3.transfer import TransferConfig
+        from botocore.config import Config as BotoConfig
+
         self.bucket = bucket
+        self.transfer_config = TransferConfig(
+            multipart_threshold=S3_MULTIPART_THRESHOLD,
+            multipart_chunksize=S3_MULTIPART_CHUNKSIZE,
+            max_concurrency=S3_MAX_CONCURRENCY,
+            use_threads=True,
+        )
+        # One process-wide client shared by all requests: low-level boto3
+        # clients are thread-safe, and a tuned pool with keepalive avoids
+        # re-doing TCP+TLS handshakes under concurrency. Worker threads
+        # should reuse this client, not build per-thread sessions.
         self.client = boto3.client(
             's3',
             aws_access_key_id=access_key,
             aws_secret_access_key=secret_key,
-            region_name=region
+            region_name=region,
+            config=BotoConfig(
+                max_pool_connections=max_pool_connections,
+                tcp_keepalive=True,
+                retries={'mode': 'standard', 'max_attempts': 3},
+                s3={'addressing_style': 'virtual'},
+            )
         )
         self.region = region
     
@@ -182,15 +293,32 @@ class S3Storage(StorageBackend):
     
     def save(self, file_id: str, file_data) -> str:
         """Save file to S3."""
+        from botocore.exceptions import ClientError
+
         s3_key = self._get_s3_key(file_id)
         
         try:
             # Handle both file-like objects and bytes
             if isinstance(file_data, bytes):
-                self.client.upload_fileobj(BytesIO(file_data), self.bucket, s3_key)
+                if len(file_data) < S3_MULTIPART_THRESHOLD:
+                    # Small payloads go out as one PutObject straight from
+                    # the bytes; no BytesIO wrapper, no chunked re-reads
+                    self.client.put_object(
+                        Bucket=self.bucket, Key=s3_key, Body=file_data
+                    )
+                else:
+                    self.client.upload_fileobj(
+                        BytesIO(file_data), self.bucket, s3_key,
+                        Config=self.transfer_config
+                    )
             else:
-                # Assume file-like object (Flask FileStorage)
-                self.client.upload_fileobj(file_data, self.bucket, s3_key)
+                # Assume file-like object (Flask FileStorage); hand boto3 the
+                # underlying stream so it reads large chunks directly
+                stream = getattr(file_data, 'stream', file_data)
+                self.client.upload_fileobj(
+                    stream, self.bucket, s3_key,
+                    Config=self.transfer_config
+                )
             
             return s3_key
         
@@ -199,21 +327,43 @@ class S3Storage(StorageBackend):
         except Exception as e:
             raise StorageError(f"Failed to save file {file_id}: {str(e)}") from e
     
-    def retrieve(self, s3_key: str) -> Iterator[bytes]:
-        """Retrieve file from S3 in chunks."""
+    def open_buffered(self, s3_key: str):
+        """
+        Open an S3 object for reading as a buffered binary stream.
+
+        Wraps the GetObject body (botocore's StreamingBody, an unbuffered
+        IOBase) in an io.BufferedReader, so send_file can hand it to the
+        WSGI server's file_wrapper and the first byte reaches the client
+        as soon as S3 produces it — nothing is downloaded to memory or
+        disk up front. Closing the reader closes the HTTP stream.
+
+        Args:
+            s3_key: S3 object key
+
+        Returns:
+            Readable file-like object streaming the object's bytes
+
+        Raises:
+            StorageError: If file not found or retrieval fails
+        """
+        from botocore.exceptions import ClientError
+
         try:
             response = self.client.get_object(Bucket=self.bucket, Key=s3_key)
-            
-            # Stream the response body in chunks
-            for chunk in iter(lambda: response['Body'].read(8192), b''):
-                yield chunk
-        
+            return BufferedReader(response['Body'], DOWNLOAD_CHUNK_SIZE)
+
         except ClientError as e:
-            if e.response['Error']['Code'] == 'NoSuchKey':
+            if e.response['Error']['Code'] in ('NoSuchKey', '404'):
                 raise StorageError(f"File not found in S3: {s3_key}") from e
             raise StorageError(f"S3 retrieval failed for {s3_key}: {str(e)}") from e
         except Exception as e:
             raise StorageError(f"Failed to retrieve file {s3_key}: {str(e)}") from e
+
+    def retrieve(self, s3_key: str) -> Iterator[bytes]:
+        """Retrieve file from S3 in chunks."""
+        with self.open_buffered(s3_key) as buffer:
+            for chunk in iter(lambda: buffer.read(DOWNLOAD_CHUNK_SIZE), b''):
+                yield chunk
     
     def delete(self, s3_key: str) -> None:
         """Delete file from S3."""
@@ -223,8 +373,25 @@ class S3Storage(StorageBackend):
             # Log error but don't raise - file might already be deleted
             pass
     
+    def delete_many(self, s3_keys) -> None:
+        """Delete multiple objects with batched DeleteObjects calls."""
+        keys = list(s3_keys)
+        try:
+            # The DeleteObjects API accepts at most 1000 keys per request
+            for start in range(0, len(keys), 1000):
+                batch = keys[start:start + 1000]
+                self.client.delete_objects(
+                    Bucket=self.bucket,
+                    Delete={'Objects': [{'Key': key} for key in batch], 'Quiet': True}
+                )
+        except Exception:
+            # Same stance as delete(): missing objects are not an error
+            pass
+
     def exists(self, s3_key: str) -> bool:
         """Check if file exists in S3."""
+        from botocore.exceptions import ClientError
+
         try:
             self.client.head_object(Bucket=self.bucket, Key=s3_key)
             return True
@@ -276,16 +443,18 @@ def get_storage_backend(config) -> StorageBackend:
             access_key = config.S3_ACCESS_KEY
             secret_key = config.S3_SECRET_KEY
             region = config.S3_REGION
+            max_pool = config.S3_MAX_POOL
         else:
             bucket = config.get('S3_BUCKET')
             access_key = config.get('S3_ACCESS_KEY')
             secret_key = config.get('S3_SECRET_KEY')
             region = config.get('S3_REGION', 'us-east-1')
-        
+            max_pool = config.get('S3_MAX_POOL', 64)
+
         if not all([bucket, access_key, secret_key]):
             raise ValueError("S3 configuration incomplete")
-        
-        return S3Storage(bucket, access_key, secret_key, region)
+
+        return S3Storage(bucket, access_key, secret_key, region, max_pool)
     
     elif backend_type == 'local':
         # Get upload folder
@@ -300,13 +469,23 @@ def get_storage_backend(config) -> StorageBackend:
         raise ValueError(f"Unknown storage backend: {backend_type}")
 
 
+# Guards print_backend_info so the S3 connection test (a list_buckets
+# round-trip) fires at most once per process, e.g. across dev reloads
+_backend_info_printed = False
+
+
 def print_backend_info(storage: StorageBackend):
     """
     Print storage backend information on startup.
-    
+
     Args:
         storage: Storage backend instance
     """
+    global _backend_info_printed
+    if _backend_info_printed:
+        return
+    _backend_info_printed = True
+
     print(f"\n[Startup] Storage backend: {storage.backend_type}")
     
     if isinstance(storage, S3Storage):
@@ -1,8 +1,10 @@
 import os
 import sys
 import tempfile
+from types import SimpleNamespace
 import pytest
 from dotenv import load_dotenv
+from flask import url_for
 
 # Set required environment variables before loading app
 os.environ['FLASK_SECRET_KEY'] = 'test-secret-key-for-testing-only'
@@ -15,17 +17,30 @@ load_dotenv(dotenv_path=os.path.join(os.path.dirname(os.path.dirname(__file__)),
 # Add parent directory to sys.path to allow direct import of 'app'
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+import app as app_module
 from app import app as flask_app, get_db, get_files_table # Import necessary items from your app
+from storage import get_storage_backend
 
 @pytest.fixture(scope='session')
 def app():
     """Create and configure a new app instance for each test session."""
 
-    # Create a temporary folder for uploads, isolated for this test session
-    temp_upload_folder = tempfile.mkdtemp()
+    # Session-scoped MonkeyPatch so environment changes are reverted on
+    # teardown instead of mutating os.environ by hand
+    mp = pytest.MonkeyPatch()
+
+    # Create a temporary folder for uploads, isolated for this test session.
+    # The worker id keeps folders distinct when running under pytest-xdist
+    # (each worker gets its own process, so mkdtemp alone already isolates,
+    # but the prefix makes leftover dirs attributable)
+    worker = os.environ.get('PYTEST_XDIST_WORKER', 'gw0')
+    # Prefer a RAM-backed directory so per-test file writes never touch
+    # the disk path (falls back to the normal temp dir elsewhere)
+    tmp_base = '/dev/shm' if os.path.isdir('/dev/shm') else None
+    temp_upload_folder = tempfile.mkdtemp(prefix=f'buzzdrop-{worker}-', dir=tmp_base)
 
     # Create a temporary file for the TinyDB database
-    db_fd, db_path = tempfile.mkstemp(suffix='.json')
+    db_fd, db_path = tempfile.mkstemp(prefix=f'buzzdrop-{worker}-', suffix='.json')
 
     flask_app.config.update({
         'TESTING': True,
@@ -38,24 +53,45 @@ def app():
     # Clear any other FLASK_USER_ variables that might interfere
     i = 3
     while os.getenv(f'FLASK_USER_{i}'):
-        del os.environ[f'FLASK_USER_{i}']
+        mp.delenv(f'FLASK_USER_{i}')
         i += 1
 
 
     # Ensure the test upload folder exists
     os.makedirs(flask_app.config['UPLOAD_FOLDER'], exist_ok=True)
 
+    # The module-level storage backend captured UPLOAD_FOLDER at import
+    # time, before this fixture updated the config; rebuild it against the
+    # test config so uploads land in the temp folder, not the repo's
+    # uploads/ directory
+    original_storage = app_module.storage
+    app_module.storage = get_storage_backend(flask_app.config)
+
     # Initialize/re-initialize the database for the test app context
     # This ensures that get_db() and get_files_table() use the test database
     with flask_app.app_context():
-        # Re-initialize db with the test path
+        # Close the import-time handle (bound to the repo-root db.json) so
+        # get_db() reopens against the test DATABASE_PATH instead of
+        # returning the still-open stale instance
+        stale_db = getattr(flask_app, 'db', None)
+        if stale_db is not None:
+            stale_db.close()
         flask_app.db = get_db() # This will use the updated DATABASE_PATH
+        # The repository resolved its table (and built its id index) from
+        # the import-time database during startup hydration; reset both so
+        # it re-resolves against the test database
+        app_module.file_repo._table = None
+        with app_module.file_repo._index_lock:
+            app_module.file_repo._id_index.clear()
         # Optionally, clear out tables if necessary, though TinyDB will use the new file
         files_table = get_files_table()
         files_table.truncate() # Clear the files table for a clean state
 
     yield flask_app
 
+    # Point the storage backend back at the import-time configuration
+    app_module.storage = original_storage
+
     # Teardown: clean up the temporary database and upload folder
     os.close(db_fd)
     os.unlink(db_path)
@@ -67,16 +103,54 @@ def app():
             os.rmdir(os.path.join(root, name))
     os.rmdir(temp_upload_folder)
 
-    # Clean up environment variables set for the test
+    # Restore any environment variables changed above; the module-level
+    # test users are removed by hand since they predate the fixture
+    mp.undo()
     del os.environ['FLASK_USER_1']
     del os.environ['FLASK_USER_2']
 
 
+@pytest.fixture(scope='session')
+def urls(app):
+    """Route URLs resolved once per session.
+
+    Static endpoints are exposed as plain strings and dynamic ones as
+    prefixes to append the id to, so tests skip the per-call reverse
+    routing that url_for performs.
+    """
+    with app.test_request_context():
+        return SimpleNamespace(
+            index=url_for('index'),
+            login=url_for('login'),
+            logout=url_for('logout'),
+            upload=url_for('upload_file'),
+            manage_users=url_for('manage_users'),
+            success_prefix=url_for('upload_success', file_id=''),
+            view_prefix=url_for('view_file', file_id=''),
+            download_prefix=url_for('download_file', file_id=''),
+            delete_prefix=url_for('delete_file', file_id=''),
+            report_decryption_prefix=url_for('report_decryption', file_id=''),
+            # The id sits mid-path here, so expose a format template
+            confirm_view_fmt=url_for('confirm_view_file', file_id='_id_').replace('_id_', '{}'),
+        )
+
 @pytest.fixture
 def client(app):
     """A test client for the app."""
     return app.test_client()
 
+@pytest.fixture(scope='module')
+def logged_in_client(app, urls):
+    """A test client already logged in as testuser, shared per module.
+
+    Saves the POST /login round trip in every test that only needs an
+    authenticated session; tests that exercise login itself keep using
+    the plain client fixture.
+    """
+    test_client = app.test_client()
+    test_client.post(urls.login, data={'username': 'testuser', 'password': 'password'})
+    return test_client
+
 @pytest.fixture(scope='function')
 def db_instance(app):
     """Provides a direct reference to the test database instance, ensuring tables are clean per test function."""
@@ -0,0 +1,45 @@
+"""PYTEST_DONT_REWRITE
+
+Shared helpers for the integration tests. The docstring marker above
+keeps pytest's assertion rewriter out of this module; it contains no
+test asserts, so rewriting it would only add import-time overhead.
+"""
+import io
+import re
+from flask import url_for
+
+# Any timestamp in the past works for expiry tests; a constant keeps the
+# tests deterministic and skips the wall-clock read + strftime
+EXPIRED_TS = '2000-01-01T00:00'
+
+# Shared payload for tests that just need "some bytes" uploaded
+SMALL_PAYLOAD = b'content'
+
+# The success page embeds the share link, so the file id can be read
+# straight out of the upload response instead of scanning TinyDB
+_SHARE_LINK_ID_RE = re.compile(rb'/view/([0-9a-f-]{36})')
+
+
+def flashed_messages(client):
+    """Read pending flash messages straight out of the session cookie so
+    a redirect response can be asserted without following it."""
+    with client.session_transaction() as sess:
+        return [message for _category, message in sess.get('_flashes', [])]
+
+
+def login_user(client, username, password=None, is_admin=False):
+    # Seed the session directly instead of POSTing /login: the file-route
+    # tests exercise routes, not authentication (test_auth.py covers
+    # that), so the login view round-trip is skipped per test.
+    with client.session_transaction() as sess:
+        sess['username'] = username
+        sess['is_admin'] = is_admin
+
+
+def upload_file_for_user(client, app, files_table, filename, content, username_for_db_record):
+    """Upload a file (content is bytes) and return its id from the response."""
+    file_data = {'file': (io.BytesIO(content), filename)}
+    response = client.post(url_for('upload_file'), data=file_data, content_type='multipart/form-data')
+
+    match = _SHARE_LINK_ID_RE.search(response.data)
+    return match.group(1).decode() if match else None
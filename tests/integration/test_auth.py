@@ -1,86 +1,70 @@
 import pytest
-from flask import session, url_for, get_flashed_messages
+from flask import session, get_flashed_messages
+from _helpers import flashed_messages
 # Fixtures 'app', 'client' will be injected from conftest.py
 # The 'app' fixture in conftest.py sets up test users:
 # os.environ['FLASK_USER_1'] = 'testuser:password:false'
 # os.environ['FLASK_USER_2'] = 'adminuser:adminpass:true'
 
-def test_login_page_loads(client):
-    response = client.get(url_for('login'))
+def test_login_page_loads(client, urls):
+    response = client.get(urls.login)
     assert response.status_code == 200
     assert b'Login' in response.data # Check for a keyword in login.html
 
-def test_login_successful_normal_user(client, app):
-    # 'testuser:password:false'
-    response = client.post(url_for('login'), data={
-        'username': 'testuser',
-        'password': 'password'
+@pytest.mark.parametrize("username,password,is_admin", [
+    ('testuser', 'password', False),   # FLASK_USER_1
+    ('adminuser', 'adminpass', True),  # FLASK_USER_2
+])
+def test_login_successful(client, urls, username, password, is_admin):
+    response = client.post(urls.login, data={
+        'username': username,
+        'password': password
     }, follow_redirects=True)
     assert response.status_code == 200
-    assert url_for('index') in response.request.path # Should redirect to index
+    assert urls.index in response.request.path # Should redirect to index
     with client.session_transaction() as sess:
-        assert sess['username'] == 'testuser'
-        assert sess['is_admin'] == False
+        assert sess['username'] == username
+        assert sess['is_admin'] == is_admin
     assert b'Logged in successfully' in response.data # Check flash message
 
-def test_login_successful_admin_user(client, app):
-    # 'adminuser:adminpass:true'
-    response = client.post(url_for('login'), data={
-        'username': 'adminuser',
-        'password': 'adminpass'
-    }, follow_redirects=True)
-    assert response.status_code == 200
-    assert url_for('index') in response.request.path
-    with client.session_transaction() as sess:
-        assert sess['username'] == 'adminuser'
-        assert sess['is_admin'] == True
-    assert b'Logged in successfully' in response.data
-
-def test_login_invalid_username(client):
-    response = client.post(url_for('login'), data={
-        'username': 'wronguser',
-        'password': 'password'
+@pytest.mark.parametrize("username,password", [
+    ('wronguser', 'password'),     # unknown username
+    ('testuser', 'wrongpassword'), # wrong password
+])
+def test_login_invalid_credentials(client, urls, username, password):
+    response = client.post(urls.login, data={
+        'username': username,
+        'password': password
     }, follow_redirects=True)
     assert response.status_code == 200 # Stays on login page
-    assert url_for('login') in response.request.path
-    with client.session_transaction() as sess:
-        assert 'username' not in sess
-    assert b'Invalid username or password' in response.data
-
-def test_login_invalid_password(client):
-    response = client.post(url_for('login'), data={
-        'username': 'testuser',
-        'password': 'wrongpassword'
-    }, follow_redirects=True)
-    assert response.status_code == 200
-    assert url_for('login') in response.request.path
+    assert urls.login in response.request.path
     with client.session_transaction() as sess:
         assert 'username' not in sess
     assert b'Invalid username or password' in response.data
 
-def test_logout(client, app):
+def test_logout(client, urls):
     # First, log in a user
-    client.post(url_for('login'), data={'username': 'testuser', 'password': 'password'})
+    client.post(urls.login, data={'username': 'testuser', 'password': 'password'})
 
     # Then, log out
-    response = client.get(url_for('logout'), follow_redirects=True)
+    response = client.get(urls.logout, follow_redirects=True)
     assert response.status_code == 200
-    assert url_for('index') in response.request.path
+    assert urls.index in response.request.path
     with client.session_transaction() as sess:
         assert 'username' not in sess
         assert 'is_admin' not in sess
     assert b'Logged out successfully' in response.data
 
-def test_login_required_redirects_to_login(client):
+def test_login_required_redirects_to_login(client, urls):
     # Accessing a login-required page like upload_success without being logged in
-    response = client.get(url_for('upload_success', file_id='somefile'), follow_redirects=True)
-    assert response.status_code == 200
-    assert url_for('login') in response.request.path # Should redirect to login
-    assert b'Please log in to access this page' in response.data
+    response = client.get(urls.success_prefix + 'somefile')
+    assert response.status_code == 302
+    assert response.headers['Location'] == urls.login # Should redirect to login
+    assert 'Please log in to access this page' in flashed_messages(client)
 
-def test_login_required_allows_access_when_logged_in(client, app):
+def test_login_required_allows_access_when_logged_in(client, urls):
     # Log in first
-    client.post(url_for('login'), data={'username': 'testuser', 'password': 'password'})
+    client.post(urls.login, data={'username': 'testuser', 'password': 'password'})
 
     # Now access the protected page. This will likely fail if 'somefile' doesn't exist,
     # but the point is to get past the login_required check.
@@ -94,7 +78,8 @@ def test_login_required_allows_access_when_logged_in(client, app):
     # Let's use the `upload_file` (POST) route's GET access attempt which is not allowed method-wise,
     # but the login_required check happens first.
 
-    response_upload_get = client.get(url_for('upload_file')) # GET request to a POST route
+    response_upload_get = client.get(urls.upload) # GET request to a POST route
+    body = response_upload_get.data
     # If not logged in, this would redirect to login.
     # If logged in, it should be a 405 Method Not Allowed, or redirect to index if GET is not handled.
     assert response_upload_get.status_code != 302 # Ensure not redirected to login
@@ -104,31 +89,28 @@ def test_login_required_allows_access_when_logged_in(client, app):
     # Common behavior for Flask is 405 if the route explicitly only defines POST.
     # If GET is not defined, it might also be a 404 if not caught by login_required first.
     # Given login_required is hit first, and then method check, a 405 is most likely if logged in.
-    assert response_upload_get.status_code == 405 or b'No file part' in response_upload_get.data or b'Method Not Allowed' in response_upload_get.data
-
-
-def test_admin_required_redirects_non_admin_to_index(client, app):
-    # Log in as a normal user
-    client.post(url_for('login'), data={'username': 'testuser', 'password': 'password'})
-
-    response = client.get(url_for('manage_users'), follow_redirects=True)
-    assert response.status_code == 200
-    assert url_for('index') in response.request.path # Should redirect to index
-    assert b'Admin access required' in response.data
-
-def test_admin_required_redirects_anonymous_to_login(client, app):
-    response = client.get(url_for('manage_users'), follow_redirects=True)
-    assert response.status_code == 200
-    assert url_for('login') in response.request.path # Redirect to login
-    assert b'Please log in to access this page' in response.data
-
-def test_admin_required_allows_admin_access(client, app):
-    # Log in as an admin user
-    client.post(url_for('login'), data={'username': 'adminuser', 'password': 'adminpass'})
-
-    response = client.get(url_for('manage_users'))
-    assert response.status_code == 200
-    assert b'Manage Users' in response.data # Check for content from users.html
-    # Check if user list is present (e.g., testuser, adminuser)
-    assert b'testuser' in response.data
-    assert b'adminuser' in response.data
+    assert response_upload_get.status_code == 405 or b'No file part' in body or b'Method Not Allowed' in body
+
+
+@pytest.mark.parametrize("credentials,expected_redirect,expected_msg", [
+    (None, 'login', 'Please log in to access this page'),          # anonymous
+    (('testuser', 'password'), 'index', 'Admin access required'),  # non-admin
+    (('adminuser', 'adminpass'), None, None),                      # admin
+])
+def test_admin_required_access(client, urls, credentials, expected_redirect, expected_msg):
+    if credentials is not None:
+        client.post(urls.login, data={'username': credentials[0], 'password': credentials[1]})
+
+    response = client.get(urls.manage_users)
+    if expected_redirect is None:
+        # Admin gets the page itself
+        assert response.status_code == 200
+        body = response.data  # fetch the body once; .data is a property
+        assert b'Manage Users' in body # Check for content from users.html
+        # Check if user list is present (e.g., testuser, adminuser)
+        assert b'testuser' in body
+        assert b'adminuser' in body
+    else:
+        assert response.status_code == 302
+        assert response.headers['Location'] == getattr(urls, expected_redirect)
+        assert expected_msg in flashed_messages(client)
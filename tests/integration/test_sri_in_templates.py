@@ -6,153 +6,128 @@ Tests verify that:
 2. crossorigin attributes are set correctly
 3. All JavaScript files have SRI protection
 """
+import binascii
 import re
 import pytest
 from io import BytesIO
+from tinydb import Query
 
 
-def test_index_page_has_sri_for_main_js(client):
-    """Test that index page includes SRI integrity check for main.js."""
-    # Login to access the page
-    client.post('/login', data={
-        'username': 'testuser',
-        'password': 'password'
-    }, follow_redirects=True)
-    
-    response = client.get('/')
-    assert response.status_code == 200
-    
-    html = response.data.decode('utf-8')
-    
-    # Check for integrity attribute with sha384
-    assert 'integrity="sha384-' in html, "main.js should have integrity attribute"
-    
-    # Check for crossorigin attribute
-    assert 'crossorigin="anonymous"' in html, "main.js should have crossorigin attribute"
-    
-    # Verify the script tag structure
-    pattern = r'<script[^>]*src="[^"]*js/main\.js"[^>]*integrity="sha384-[A-Za-z0-9+/=]+"[^>]*crossorigin="anonymous"[^>]*>'
-    assert re.search(pattern, html), "main.js script tag should have correct SRI attributes"
+def _script_sri_pattern(js_name):
+    """Compile the SRI script-tag pattern for a static/js file.
+
+    Patterns are bytes so tests can match response.data directly without
+    decoding the whole body to str first.
+    """
+    return re.compile(
+        rb'<script[^>]*src="[^"]*js/' + js_name.encode() +
+        rb'\.js"[^>]*integrity="sha256-[A-Za-z0-9+/=]+"[^>]*crossorigin="anonymous"[^>]*>'
+    )
+
+
+# Compiled once at import; each test dispatches straight into the matcher
+# instead of re-parsing the long pattern
+_SRI_SCRIPT_RES = {name: _script_sri_pattern(name)
+                   for name in ('main', 'view', 'success')}
+# Capture group isolates the base64 digest so callers need no prefix
+# stripping after the match
+_INTEGRITY_RE = re.compile(rb'integrity="sha256-([A-Za-z0-9+/=]+)"')
+_MODULE_MAIN_JS_RE = re.compile(
+    rb'<script[^>]*type="module"[^>]*src="[^"]*js/main\.js"[^>]*integrity="sha256-[^"]*"[^>]*>'
+)
 
 
-def test_view_page_has_sri_for_view_js(client, db_instance, files_table):
-    """Test that view page includes SRI integrity check for view.js."""
-    # Login first
+@pytest.fixture
+def uploaded_file_id(client, db_instance, files_table):
+    """Log in as testuser and upload one file, returning its id.
+
+    Function-scoped (not module) because db_instance truncates the tables
+    per test function.
+    """
     with client.session_transaction() as sess:
         sess['username'] = 'testuser'
         sess['is_admin'] = False
-    
-    # Upload a test file
+
     client.post('/upload', data={
         'file': (BytesIO(b'test content'), 'test.txt'),
         'expiry': ''
     }, content_type='multipart/form-data')
-    
-    # Get file_id from database
-    from tinydb import Query
+
     File = Query()
     file_info = files_table.get(File.original_name == 'test.txt')
     assert file_info is not None
-    file_id = file_info['id']
-    
-    # Visit the confirm view page (this renders view.html)
-    response = client.post(f'/view/{file_id}/confirm', follow_redirects=False)
+    return file_info['id']
+
+
+@pytest.mark.parametrize("url_template,method,js_name", [
+    ('/', 'get', 'main'),                         # index.html
+    ('/view/{file_id}/confirm', 'post', 'view'),  # view.html
+    ('/success/{file_id}', 'get', 'success'),     # success.html
+])
+def test_page_has_sri_for_script(client, uploaded_file_id, url_template, method, js_name):
+    """Test that each page includes SRI integrity checks for its script."""
+    response = getattr(client, method)(url_template.format(file_id=uploaded_file_id))
     assert response.status_code == 200
-    
-    html = response.data.decode('utf-8')
-    
-    # Check for integrity attribute
-    assert 'integrity="sha384-' in html, "view.js should have integrity attribute"
-    assert 'crossorigin="anonymous"' in html, "view.js should have crossorigin attribute"
-    
+
+    body = response.data
+
+    # Check for integrity and crossorigin attributes
+    assert b'integrity="sha256-' in body, f"{js_name}.js should have integrity attribute"
+    assert b'crossorigin="anonymous"' in body, f"{js_name}.js should have crossorigin attribute"
+
     # Verify the script tag structure
-    pattern = r'<script[^>]*src="[^"]*js/view\.js"[^>]*integrity="sha384-[A-Za-z0-9+/=]+"[^>]*crossorigin="anonymous"[^>]*>'
-    assert re.search(pattern, html), "view.js script tag should have correct SRI attributes"
+    assert _SRI_SCRIPT_RES[js_name].search(body), \
+        f"{js_name}.js script tag should have correct SRI attributes"
+
 
+@pytest.fixture(scope='module')
+def index_html(app):
+    """Render the index page once and share the body (bytes) across this module.
 
-def test_success_page_has_sri_for_success_js(client, db_instance, files_table):
-    """Test that success page includes SRI integrity check for success.js."""
+    The index-page assertions only inspect the rendered markup, so one
+    login + GET covers every test that reads it.
+    """
+    client = app.test_client()
     with client.session_transaction() as sess:
         sess['username'] = 'testuser'
         sess['is_admin'] = False
-    
-    # Upload a test file to get to success page
-    client.post('/upload', data={
-        'file': (BytesIO(b'test content'), 'success_test.txt'),
-        'expiry': ''
-    }, content_type='multipart/form-data')
-    
-    # Get file_id from database
-    from tinydb import Query
-    File = Query()
-    file_info = files_table.get(File.original_name == 'success_test.txt')
-    assert file_info is not None
-    file_id = file_info['id']
-    
-    # Visit success page
-    response = client.get(f'/success/{file_id}')
+    response = client.get('/')
     assert response.status_code == 200
-    
-    html = response.data.decode('utf-8')
-    
-    # Check for integrity attribute
-    assert 'integrity="sha384-' in html, "success.js should have integrity attribute"
-    assert 'crossorigin="anonymous"' in html, "success.js should have crossorigin attribute"
-    
-    # Verify the script tag structure
-    pattern = r'<script[^>]*src="[^"]*js/success\.js"[^>]*integrity="sha384-[A-Za-z0-9+/=]+"[^>]*crossorigin="anonymous"[^>]*>'
-    assert re.search(pattern, html), "success.js script tag should have correct SRI attributes"
+    return response.data
 
 
-def test_sri_hashes_are_valid_base64(client):
+def test_sri_hashes_are_valid_base64(index_html):
     """Test that all SRI hashes in HTML are valid base64."""
-    client.post('/login', data={
-        'username': 'testuser',
-        'password': 'password'
-    }, follow_redirects=True)
-    
-    response = client.get('/')
-    html = response.data.decode('utf-8')
-    
-    # Extract all integrity values
-    integrity_pattern = r'integrity="(sha384-[A-Za-z0-9+/=]+)"'
-    matches = re.findall(integrity_pattern, html)
-    
-    assert len(matches) > 0, "Should find at least one integrity attribute"
-    
-    for integrity_value in matches:
-        # Verify format
-        assert integrity_value.startswith('sha384-'), "Should use SHA-384"
-        
-        # Extract base64 part
-        hash_value = integrity_value.replace('sha384-', '')
-        
-        # Verify it's valid base64 (SHA-384 produces 48 bytes = 64 base64 chars)
-        assert len(hash_value) == 64, f"Hash should be 64 characters: {hash_value}"
+    html = index_html
+
+    # Single pass over the HTML; the sha256- prefix is matched by the
+    # pattern itself and the group yields the bare digest
+    found = 0
+    for match in _INTEGRITY_RE.finditer(html):
+        found += 1
+        hash_value = match.group(1)
+
+        # Verify it's valid base64 (SHA-256 produces 32 bytes = 44 base64 chars)
+        assert len(hash_value) == 44, f"Hash should be 44 characters: {hash_value!r}"
         
-        # Verify base64 character set
-        import base64
+        # Verify base64 character set; strict_mode rejects the padding and
+        # character sloppiness that base64.b64decode silently ignores
         try:
-            decoded = base64.b64decode(hash_value)
-            assert len(decoded) == 48, "SHA-384 should produce 48 bytes"
-        except Exception as e:
-            pytest.fail(f"Invalid base64 in hash: {hash_value}, error: {e}")
+            decoded = binascii.a2b_base64(hash_value, strict_mode=True)
+            assert len(decoded) == 32, "SHA-256 should produce 32 bytes"
+        except binascii.Error as e:
+            pytest.fail(f"Invalid base64 in hash: {hash_value!r}, error: {e}")
+
+    assert found > 0, "Should find at least one integrity attribute"
 
 
-def test_module_scripts_maintain_type_attribute(client):
+def test_module_scripts_maintain_type_attribute(index_html):
     """Test that ES6 module scripts still have type='module' attribute along with SRI."""
-    client.post('/login', data={
-        'username': 'testuser',
-        'password': 'password'
-    }, follow_redirects=True)
-    
-    response = client.get('/')
-    html = response.data.decode('utf-8')
-    
+    html = index_html
+
     # Check that main.js has both type="module" and integrity
-    assert 'type="module"' in html, "Should maintain ES6 module support"
-    assert 'integrity="sha384-' in html, "Should have SRI"
+    assert b'type="module"' in html, "Should maintain ES6 module support"
+    assert b'integrity="sha256-' in html, "Should have SRI"
     
     # Verify both are on the same script tag for main.js
-    pattern = r'<script[^>]*type="module"[^>]*src="[^"]*js/main\.js"[^>]*integrity="sha384-[^"]*"[^>]*>'
-    assert re.search(pattern, html), "main.js should have both type='module' and integrity"
+    assert _MODULE_MAIN_JS_RE.search(html), "main.js should have both type='module' and integrity"
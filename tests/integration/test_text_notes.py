@@ -1,12 +1,36 @@
 import base64
-from flask import url_for
+import pytest
 from tinydb import Query
 
-def login_user(client, username, password):
-    """Helper function to log in a user."""
-    return client.post(url_for('login'), data={'username': username, 'password': password}, follow_redirects=True)
+# Mock encrypted note payload shared by the upload preambles
+_MOCK_NOTE = base64.b64encode(b"Test note").decode('utf-8')
+
+@pytest.fixture(scope='module')
+def ajax_client(app, urls):
+    """Logged-in client whose WSGI environ always carries the AJAX header.
+
+    Baking HTTP_X_REQUESTED_WITH into environ_base saves rebuilding the
+    headers dict on every JSON upload in this module.
+    """
+    test_client = app.test_client()
+    test_client.environ_base['HTTP_X_REQUESTED_WITH'] = 'XMLHttpRequest'
+    test_client.post(urls.login, data={'username': 'testuser', 'password': 'password'})
+    return test_client
+
+@pytest.fixture
+def uploaded_note(ajax_client, urls, files_table):
+    """Upload one mock text note and return its id.
+
+    Replaces the identical upload preamble the view/confirm/delete/report
+    tests each performed inline.
+    """
+    response = ajax_client.post(
+        urls.upload,
+        data={'note_text': _MOCK_NOTE, 'type': 'text'}
+    )
+    return response.get_json()['file_id']
 
-def test_upload_text_note_requires_login(client):
+def test_upload_text_note_requires_login(client, urls):
     """Test that uploading a text note requires authentication."""
     # Mock encrypted text data (base64 encoded)
     mock_encrypted = base64.b64encode(b"mock encrypted data").decode('utf-8')
@@ -14,14 +38,12 @@ def test_upload_text_note_requires_login(client):
         'note_text': mock_encrypted,
         'type': 'text'
     }
-    response = client.post(url_for('upload_file'), data=data, follow_redirects=False)
+    response = client.post(urls.upload, data=data, follow_redirects=False)
     assert response.status_code == 302  # Redirect to login
     assert b'/login' in response.data or response.location.endswith('/login')
 
-def test_upload_text_note_success(client, app, files_table):
+def test_upload_text_note_success(ajax_client, urls, files_table):
     """Test successful text note upload."""
-    login_user(client, 'testuser', 'password')
-
     # Simulate encrypted text (base64 encoded)
     test_text = b"This is a secret text note"
     mock_encrypted = base64.b64encode(test_text).decode('utf-8')
@@ -31,11 +53,10 @@ def test_upload_text_note_success(client, app, files_table):
         'type': 'text'
     }
 
-    response = client.post(
-        url_for('upload_file'),
+    response = ajax_client.post(
+        urls.upload,
         data=data,
-        follow_redirects=False,
-        headers={'X-Requested-With': 'XMLHttpRequest'}
+        follow_redirects=False
     )
 
     assert response.status_code == 200
@@ -53,10 +74,8 @@ def test_upload_text_note_success(client, app, files_table):
     assert note_info['uploaded_by'] == 'testuser'
     assert note_info['status'] == 'active'
 
-def test_upload_text_note_with_expiry(client, app, files_table):
+def test_upload_text_note_with_expiry(ajax_client, urls, files_table):
     """Test text note upload with expiry date."""
-    login_user(client, 'testuser', 'password')
-
     mock_encrypted = base64.b64encode(b"Expiring note").decode('utf-8')
     expiry_date = '2025-12-31T23:59'
 
@@ -66,11 +85,10 @@ def test_upload_text_note_with_expiry(client, app, files_table):
         'expiry': expiry_date
     }
 
-    response = client.post(
-        url_for('upload_file'),
+    response = ajax_client.post(
+        urls.upload,
         data=data,
-        follow_redirects=False,
-        headers={'X-Requested-With': 'XMLHttpRequest'}
+        follow_redirects=False
     )
 
     assert response.status_code == 200
@@ -82,68 +100,35 @@ def test_upload_text_note_with_expiry(client, app, files_table):
     assert note_info['expiry_at'] is not None
     assert '2025-12-31' in note_info['expiry_at']
 
-def test_view_text_note_shows_correct_template(client, app, files_table):
+def test_view_text_note_shows_correct_template(logged_in_client, urls, uploaded_note):
     """Test that viewing a text note shows the correct template with text type."""
-    login_user(client, 'testuser', 'password')
-
-    # Upload a text note first
-    mock_encrypted = base64.b64encode(b"Test note").decode('utf-8')
-    response = client.post(
-        url_for('upload_file'),
-        data={'note_text': mock_encrypted, 'type': 'text'},
-        headers={'X-Requested-With': 'XMLHttpRequest'}
-    )
-    note_id = response.get_json()['file_id']
-
     # View the note (confirm page)
-    response = client.get(url_for('view_file', file_id=note_id))
+    response = logged_in_client.get(urls.view_prefix + uploaded_note)
     assert response.status_code == 200
     assert b'Secret Note' in response.data
     assert b'Ready to View?' in response.data
     assert b'Viewing will immediately delete this note' in response.data
 
-def test_confirm_view_text_note(client, app, files_table):
+def test_confirm_view_text_note(logged_in_client, urls, uploaded_note):
     """Test the confirm view page for text notes."""
-    login_user(client, 'testuser', 'password')
-
-    # Upload a text note first
-    mock_encrypted = base64.b64encode(b"Test note").decode('utf-8')
-    response = client.post(
-        url_for('upload_file'),
-        data={'note_text': mock_encrypted, 'type': 'text'},
-        headers={'X-Requested-With': 'XMLHttpRequest'}
-    )
-    note_id = response.get_json()['file_id']
-
     # Confirm view
-    response = client.post(url_for('confirm_view_file', file_id=note_id))
+    response = logged_in_client.post(urls.confirm_view_fmt.format(uploaded_note))
     assert response.status_code == 200
     assert b'Decrypt and View' in response.data
     assert b'window.fileType = "text"' in response.data
     assert b'text-display' in response.data  # Text display div should be present
 
-def test_text_note_type_field_in_database(client, app, files_table):
+def test_text_note_type_field_in_database(logged_in_client, urls, uploaded_note, files_table):
     """Test that text notes have correct type field in database."""
-    login_user(client, 'testuser', 'password')
-
-    # Upload text note
-    mock_encrypted = base64.b64encode(b"Test note").decode('utf-8')
-    response = client.post(
-        url_for('upload_file'),
-        data={'note_text': mock_encrypted, 'type': 'text'},
-        headers={'X-Requested-With': 'XMLHttpRequest'}
-    )
-    note_id = response.get_json()['file_id']
-
     # Check database
     File = Query()
-    note_info = files_table.get(File.id == note_id)
+    note_info = files_table.get(File.id == uploaded_note)
     assert note_info['type'] == 'text'
 
     # Compare with regular file upload
     import io
-    file_response = client.post(
-        url_for('upload_file'),
+    file_response = logged_in_client.post(
+        urls.upload,
         data={'file': (io.BytesIO(b"test content"), "test.txt")},
         content_type='multipart/form-data',
         follow_redirects=False
@@ -151,20 +136,18 @@ def test_text_note_type_field_in_database(client, app, files_table):
     # Extract file_id from response
     assert file_response.status_code == 200
 
-    # Get the most recent file that's not the note
-    all_files = files_table.all()
-    file_upload = [f for f in all_files if f['id'] != note_id][0]
+    # Get the upload that's not the note, letting TinyDB do the filtering
+    File = Query()
+    file_upload = files_table.get(File.id != uploaded_note)
     assert file_upload['type'] == 'file'
 
-def test_text_note_success_page(client, app):
+def test_text_note_success_page(logged_in_client, urls):
     """Test that success page shows correct message for text notes."""
-    login_user(client, 'testuser', 'password')
-
     mock_encrypted = base64.b64encode(b"Test note").decode('utf-8')
 
     # Post without AJAX to get HTML response
-    response = client.post(
-        url_for('upload_file'),
+    response = logged_in_client.post(
+        urls.upload,
         data={'note_text': mock_encrypted, 'type': 'text'},
         follow_redirects=False
     )
@@ -173,66 +156,42 @@ def test_text_note_success_page(client, app):
     assert b'Text Note Shared Successfully!' in response.data
     assert b'The note will be deleted after the first view' in response.data
 
-def test_text_note_deletion_after_view(client, app, files_table):
+def test_text_note_deletion_after_view(logged_in_client, urls, uploaded_note, files_table):
     """Test that text note is marked as downloaded after viewing."""
-    login_user(client, 'testuser', 'password')
-
-    # Upload text note
-    mock_encrypted = base64.b64encode(b"Test note").decode('utf-8')
-    response = client.post(
-        url_for('upload_file'),
-        data={'note_text': mock_encrypted, 'type': 'text'},
-        headers={'X-Requested-With': 'XMLHttpRequest'}
-    )
-    note_id = response.get_json()['file_id']
-
     # Download the note
-    response = client.get(url_for('download_file', file_id=note_id))
+    response = logged_in_client.get(urls.download_prefix + uploaded_note)
     assert response.status_code == 200
 
     # Verify it's marked as downloaded
     File = Query()
-    note_info = files_table.get(File.id == note_id)
+    note_info = files_table.get(File.id == uploaded_note)
     assert note_info['downloaded_at'] is not None
 
     # Try to view again - should fail
-    response = client.get(url_for('view_file', file_id=note_id), follow_redirects=False)
+    response = logged_in_client.get(urls.view_prefix + uploaded_note, follow_redirects=False)
     assert response.status_code == 302  # Redirect because already downloaded
 
-def test_delete_text_note_before_view(client, app, files_table):
+def test_delete_text_note_before_view(logged_in_client, urls, uploaded_note, files_table):
     """Test manual deletion of text note before it's viewed."""
-    login_user(client, 'testuser', 'password')
-
-    # Upload text note
-    mock_encrypted = base64.b64encode(b"Test note").decode('utf-8')
-    response = client.post(
-        url_for('upload_file'),
-        data={'note_text': mock_encrypted, 'type': 'text'},
-        headers={'X-Requested-With': 'XMLHttpRequest'}
-    )
-    note_id = response.get_json()['file_id']
-
     # Delete the note
-    response = client.post(url_for('delete_file', file_id=note_id), follow_redirects=True)
+    response = logged_in_client.post(urls.delete_prefix + uploaded_note, follow_redirects=True)
     assert response.status_code == 200
 
     # Verify it's removed from database
     File = Query()
-    note_info = files_table.get(File.id == note_id)
+    note_info = files_table.get(File.id == uploaded_note)
     assert note_info is None
 
-def test_text_note_empty_content(client, app):
+def test_text_note_empty_content(logged_in_client, urls):
     """Test that empty text note is rejected."""
-    login_user(client, 'testuser', 'password')
-
     # Try to upload empty note
     data = {
         'note_text': '',
         'type': 'text'
     }
 
-    response = client.post(
-        url_for('upload_file'),
+    response = logged_in_client.post(
+        urls.upload,
         data=data,
         follow_redirects=False
     )
@@ -242,27 +201,16 @@ def test_text_note_empty_content(client, app):
     # and fall through to file upload logic which will fail
     assert response.status_code in [302, 400]
 
-def test_report_decryption_for_text_note(client, app, files_table):
+def test_report_decryption_for_text_note(logged_in_client, urls, uploaded_note, files_table):
     """Test reporting decryption success for text notes."""
-    login_user(client, 'testuser', 'password')
-
-    # Upload text note
-    mock_encrypted = base64.b64encode(b"Test note").decode('utf-8')
-    response = client.post(
-        url_for('upload_file'),
-        data={'note_text': mock_encrypted, 'type': 'text'},
-        headers={'X-Requested-With': 'XMLHttpRequest'}
-    )
-    note_id = response.get_json()['file_id']
-
     # Report decryption success
-    response = client.post(
-        url_for('report_decryption', file_id=note_id),
+    response = logged_in_client.post(
+        urls.report_decryption_prefix + uploaded_note,
         json={'success': True}
     )
     assert response.status_code == 200
 
     # Verify in database
     File = Query()
-    note_info = files_table.get(File.id == note_id)
+    note_info = files_table.get(File.id == uploaded_note)
     assert note_info['decryption_success'] is True
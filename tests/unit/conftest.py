@@ -0,0 +1,31 @@
+import os
+import shutil
+
+import pytest
+
+from app import app as flask_app
+
+
+@pytest.fixture(scope='module', autouse=True)
+def _request_ctx():
+    """Push one request context per unit-test module.
+
+    The unit tests never go through the test client, so a single pushed
+    context replaces the per-test `with app.test_request_context():`
+    blocks (context push/pop touches thread-locals each time).
+    """
+    with flask_app.test_request_context():
+        yield
+
+
+@pytest.fixture
+def clean_upload_dir(app):
+    """Return the upload folder, emptied with one rmtree tree-walk.
+
+    Replaces the per-entry listdir/remove loops the cleanup tests used
+    to start with.
+    """
+    upload_dir = app.config['UPLOAD_FOLDER']
+    shutil.rmtree(upload_dir, ignore_errors=True)
+    os.makedirs(upload_dir)
+    return upload_dir
@@ -1,10 +1,8 @@
 import pytest
 import os
-import shutil # For file operations in cleanup test setup
 from app import get_files_table
 from utils import cleanup_orphaned_files
 from tinydb import Query
-from unittest import mock
 # Fixtures 'app', 'db_instance', 'files_table' will be injected from conftest.py
 
 def test_add_and_get_file_record(files_table):
@@ -32,18 +30,10 @@ def test_get_non_existent_file_record(files_table):
     retrieved_file = files_table.get(File.id == 'nonexistent')
     assert retrieved_file is None
 
-def test_cleanup_orphaned_files_no_orphans(app, files_table):
-    # app fixture provides UPLOAD_FOLDER
+def test_cleanup_orphaned_files_no_orphans(clean_upload_dir, files_table):
+    # clean_upload_dir empties UPLOAD_FOLDER and returns it
     # files_table fixture provides the db table
-    upload_dir = app.config['UPLOAD_FOLDER']
-
-    # Clean the upload directory before the test to remove leftovers from other tests
-    for item in os.listdir(upload_dir):
-        item_path = os.path.join(upload_dir, item)
-        if os.path.isfile(item_path):
-            os.remove(item_path)
-        elif os.path.isdir(item_path):
-            shutil.rmtree(item_path)
+    upload_dir = clean_upload_dir
 
     # Create a dummy file on disk that IS tracked
     tracked_file_on_disk_path = os.path.join(upload_dir, "tracked_file.txt")
@@ -54,112 +44,64 @@ def test_cleanup_orphaned_files_no_orphans(app, files_table):
 
     # Get tracked files from database
     tracked_files = set(f['path'].split(os.sep)[-1] for f in files_table.all())
-    
-    with mock.patch('os.remove') as mock_remove:
-        cleanup_orphaned_files(upload_dir, tracked_files)
-        mock_remove.assert_not_called() # No files should be removed
 
-    # Ensure the tracked file is still there (optional, os.remove is mocked)
+    removed = cleanup_orphaned_files(upload_dir, tracked_files)
+
+    # No files should be removed; the tracked file is still there
+    assert removed == 0
     assert os.path.exists(tracked_file_on_disk_path)
     # Clean up the created file
     os.remove(tracked_file_on_disk_path)
 
-def test_cleanup_orphaned_files_with_orphans(app, files_table):
-    upload_dir = app.config['UPLOAD_FOLDER']
-
-    # Clean the upload directory before the test
-    for item in os.listdir(upload_dir):
-        item_path = os.path.join(upload_dir, item)
-        if os.path.isfile(item_path):
-            os.remove(item_path)
-        elif os.path.isdir(item_path):
-            shutil.rmtree(item_path)
+def test_cleanup_orphaned_files_with_orphans(app, clean_upload_dir, files_table):
+    upload_dir = clean_upload_dir
 
     # File on disk, tracked in DB
     tracked_file_path = os.path.join(upload_dir, "tracked.txt")
     with open(tracked_file_path, "w") as f: f.write("tracked")
-    files_table.insert({'id': 't1', 'path': tracked_file_path, 'original_name': 'tracked.txt'})
 
     # File on disk, NOT tracked in DB (orphan)
     orphaned_file_path = os.path.join(upload_dir, "orphaned.txt")
     with open(orphaned_file_path, "w") as f: f.write("orphan")
 
-    # File in DB, NOT on disk (should be ignored by cleanup_orphaned_files)
-    files_table.insert({'id': 'db_only', 'path': os.path.join(upload_dir, "db_only_missing_on_disk.txt"), 'original_name': 'db_only.txt'})
+    # One batched insert: the tracked file plus a record that exists in
+    # the DB but NOT on disk (ignored by cleanup_orphaned_files)
+    files_table.insert_multiple([
+        {'id': 't1', 'path': tracked_file_path, 'original_name': 'tracked.txt'},
+        {'id': 'db_only', 'path': os.path.join(upload_dir, "db_only_missing_on_disk.txt"), 'original_name': 'db_only.txt'},
+    ])
 
     # Get tracked files from database
     tracked_files = set(f['path'].split(os.sep)[-1] for f in files_table.all())
-    
-    # Mock os.remove to check it's called on the correct file
-    # os.listdir and os.path.exists will operate on the actual temp test upload folder
-    removed_paths = []
-    original_os_remove = os.remove
-    def mock_os_remove(path):
-        removed_paths.append(path)
-        original_os_remove(path) # actually remove for post-condition check
-
-    with mock.patch('os.remove', side_effect=mock_os_remove) as mocked_remove:
-        with app.app_context():
-             cleanup_orphaned_files(upload_dir, tracked_files)
-
-        # Assertions
-        assert orphaned_file_path in removed_paths
-        assert tracked_file_path not in removed_paths
 
-        mocked_remove.assert_any_call(orphaned_file_path) # Check that os.remove was called with the orphan
+    with app.app_context():
+        removed = cleanup_orphaned_files(upload_dir, tracked_files)
 
-        # Verify actual file system state
-        assert os.path.exists(tracked_file_path)
-        assert not os.path.exists(orphaned_file_path)
+    # The filesystem state is the assertion: exactly the orphan is gone
+    assert removed == 1
+    assert os.path.exists(tracked_file_path)
+    assert not os.path.exists(orphaned_file_path)
 
     # Cleanup
-    if os.path.exists(tracked_file_path):
-        os.remove(tracked_file_path)
+    os.remove(tracked_file_path)
 
 
-def test_cleanup_orphaned_files_empty_uploads_dir(app, files_table):
-    upload_dir = app.config['UPLOAD_FOLDER']
-    # Clean the upload directory before the test (it should be empty for this test's purpose anyway)
-    for item in os.listdir(upload_dir):
-        item_path = os.path.join(upload_dir, item)
-        if os.path.isfile(item_path):
-            os.remove(item_path)
-        elif os.path.isdir(item_path):
-            shutil.rmtree(item_path)
+def test_cleanup_orphaned_files_empty_uploads_dir(clean_upload_dir, files_table):
+    upload_dir = clean_upload_dir
 
     files_table.insert({'id': 'db_only', 'path': os.path.join(upload_dir, "some_file_in_db.txt")})
 
     # Get tracked files from database
     tracked_files = set(f['path'].split(os.sep)[-1] for f in files_table.all())
-    
-    with mock.patch('os.remove') as mock_remove:
-        cleanup_orphaned_files(upload_dir, tracked_files)
-        mock_remove.assert_not_called()
+
+    assert cleanup_orphaned_files(upload_dir, tracked_files) == 0
 
 def test_cleanup_orphaned_files_uploads_dir_does_not_exist(app, files_table):
-    # This test needs to temporarily remove the upload directory.
-    upload_dir = app.config['UPLOAD_FOLDER']
-    original_upload_dir_path = upload_dir
-
-    # Temporarily "remove" the directory by renaming it, or ensure it's gone
-    # For this test, cleanup_orphaned_files itself checks os.path.exists(upload_dir)
-    # So, we can mock os.path.exists for the upload_dir path to return False.
-
-    with mock.patch('os.path.exists') as mock_path_exists, \
-         mock.patch('os.listdir') as mock_listdir, \
-         mock.patch('os.remove') as mock_remove:
-
-        # Make os.path.exists return False only for the specific upload_dir path
-        def side_effect_exists(path):
-            if path == upload_dir:
-                return False
-            return os.path.exists(path) # Call original for other paths
-        mock_path_exists.side_effect = side_effect_exists
-
-        # Get tracked files from database  
-        tracked_files = set(f['path'].split(os.sep)[-1] for f in files_table.all())
-        
-        cleanup_orphaned_files(upload_dir, tracked_files)
-
-        mock_listdir.assert_not_called() # Should not attempt to listdir if path doesn't exist
-        mock_remove.assert_not_called() # No removal attempts
+    # Point at a directory that genuinely does not exist; the function
+    # should swallow the missing-directory case and remove nothing
+    upload_dir = os.path.join(app.config['UPLOAD_FOLDER'], 'does-not-exist')
+
+    # Get tracked files from database
+    tracked_files = set(f['path'].split(os.sep)[-1] for f in files_table.all())
+
+    assert cleanup_orphaned_files(upload_dir, tracked_files) == 0